@@ -12,12 +12,17 @@ from datetime import datetime, timedelta
 import yaml
 from influxdb_client import InfluxDBClient
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 app = Flask(__name__)
 
 # Load configuration
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.yaml')
 with open(CONFIG_FILE, 'r') as f:
-    config = yaml.safe_load(f)
+    config = yaml.load(f, Loader=_Loader)
 
 TARIFFS_FILE = os.path.join(os.path.dirname(__file__), 'tariffs.json')
 DEFAULT_TARIFFS = config.get('tariffs', {
@@ -7,19 +7,35 @@ applies break-even tariffs, and stores all values in InfluxDB.
 
 import json
 import os
+import queue
 import ssl
 import logging
+import threading
 from datetime import datetime
-from typing import Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
 import yaml
 import paho.mqtt.client as mqtt
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client import InfluxDBClient
+from influxdb_client.client.write_api import WriteOptions
+
+_loads: Callable[[bytes], Any]
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson not installed, use the stdlib parser (also accepts bytes)
+    _loads = json.loads
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
 
 # Load configuration
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
 with open(CONFIG_FILE, "r") as f:
-    config = yaml.safe_load(f)
+    config = yaml.load(f, Loader=_Loader)
 
 # Extract config values
 MQTT_BROKER = config["mqtt"]["broker"]
@@ -41,7 +57,7 @@ LOG_LEVEL = config["logging"]["level"]
 LOG_FILE = config["logging"].get("file")
 
 # Configure logging
-handlers = [logging.StreamHandler()]
+handlers: List[logging.Handler] = [logging.StreamHandler()]
 if LOG_FILE:
     try:
         handlers.append(logging.FileHandler(LOG_FILE))
@@ -55,14 +71,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Batched InfluxDB writes
+WRITE_OPTIONS = WriteOptions(batch_size=500, flush_interval=10_000, jitter_interval=2_000, retry_interval=5_000)
+
+# Line protocol
+_ESCAPE_TAG = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ "})
+HOUSE_LINE = (
+    "{series} ei_kwh={ei},eo_kwh={eo},delta_ei_kwh={delta_ei},delta_eo_kwh={delta_eo},"
+    "net_flow_kwh={net_flow},value_consumption_ct={value_con},value_pv_delivery_ct={value_pv},"
+    "tariff_p_consumption={p_con},tariff_p_pv_delivery={p_pv}"
+)
+COMMUNITY_LINE = (
+    "community_energy total_consumption_kwh={consumption},total_production_kwh={production},"
+    "grid_import_kwh={grid_import},grid_export_kwh={grid_export},"
+    "value_grid_import_ct={value_import},value_grid_export_ct={value_export},"
+    "tariff_p_grid_consumption={p_grid_con},tariff_p_grid_delivery={p_grid_del}"
+)
+
 # Tariffs file path
 TARIFFS_FILE = os.path.join(os.path.dirname(__file__), "tariffs.json")
 
 
 class EnergyCollector:
-    def __init__(self):
-        self.previous_values: Dict[str, Dict[str, float]] = {}
-        self.current_interval: Dict[str, Dict] = {}
+    def __init__(self) -> None:
+        # Houses in a fixed order; per-house state below is held in arrays aligned with it
+        self._macs: Tuple[str, ...] = tuple(HOUSE_CONFIG)
+        self._house_ids: Tuple[int, ...] = tuple(HOUSE_CONFIG[mac]["id"] for mac in self._macs)
+        self._mac_to_idx = {mac: i for i, mac in enumerate(self._macs)}
+        n = len(self._macs)
+        self.prev_ei = np.zeros(n, dtype=np.float64)   # Last meter readings (0 = no baseline yet)
+        self.prev_eo = np.zeros(n, dtype=np.float64)
+        self.sum_dei = np.zeros(n, dtype=np.float64)   # Energy deltas accumulated this interval
+        self.sum_deo = np.zeros(n, dtype=np.float64)
+        self.last_ei = np.zeros(n, dtype=np.float64)   # Meter readings at the last accepted delta
+        self.last_eo = np.zeros(n, dtype=np.float64)
+        self.reported = np.zeros(n, dtype=bool)        # Houses with data in this interval
+        # Guards the interval accumulators above between the worker thread and store_interval_data
+        self._interval_lock = threading.Lock()
+        # Parsed tariffs file and the (mtime, size) it was read at
+        self._tariffs_cache: Optional[Dict[str, float]] = None
+        self._tariffs_stat: Optional[Tuple[float, int]] = None
+        # Measurement and tag set of each house's line
+        self._house_series = tuple(
+            f"house_energy,house_id={str(house_id).translate(_ESCAPE_TAG)},mac={mac.translate(_ESCAPE_TAG)}"
+            for mac, house_id in zip(self._macs, self._house_ids)
+        )
 
         self.influx_client = InfluxDBClient(
             url=INFLUX_URL,
@@ -70,15 +123,54 @@ class EnergyCollector:
             org=INFLUX_ORG,
             verify_ssl=False
         )
-        self.write_api = self.influx_client.write_api(write_options=SYNCHRONOUS)
+        self.write_api = self.influx_client.write_api(
+            write_options=WRITE_OPTIONS,
+            error_callback=self._on_write_error
+        )
         logger.info(f"Connected to InfluxDB at {INFLUX_URL}")
 
+        # Raw MQTT messages are parsed and processed here, off paho's network thread
+        self._messages: "queue.SimpleQueue[Tuple[str, bytes]]" = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._process_messages, name="collector-worker", daemon=True)
+        self._worker.start()
+
+    @staticmethod
+    def _on_write_error(conf, data, exception):
+        """Log a batch the background writer failed to store."""
+        logger.error(f"Failed to write batch to InfluxDB: {exception}")
+
+    def close(self) -> None:
+        """Flush buffered points and close the InfluxDB connection."""
+        self.write_api.close()
+        self.influx_client.close()
+
+    def submit_message(self, mac: str, payload: bytes) -> None:
+        """Queue a raw MQTT payload for the worker thread."""
+        self._messages.put((mac, payload))
+
+    def _process_messages(self) -> None:
+        """Worker loop: parse queued payloads and process them in arrival order."""
+        while True:
+            mac, payload = self._messages.get()
+            try:
+                self.process_message(mac, _loads(payload))
+            except Exception as e:
+                logger.error(f"Error processing message: {e}")
+
     def load_base_tariffs(self) -> Dict[str, float]:
-        """Load policy tariffs from file or use defaults."""
-        if os.path.exists(TARIFFS_FILE):
+        """Load policy tariffs from file or use defaults; the file is re-parsed only when it changes."""
+        try:
+            st = os.stat(TARIFFS_FILE)
+        except FileNotFoundError:
+            return DEFAULT_TARIFFS.copy()
+
+        if self._tariffs_cache is None or self._tariffs_stat != (st.st_mtime, st.st_size):
             with open(TARIFFS_FILE, "r") as f:
-                return json.load(f)
-        return DEFAULT_TARIFFS.copy()
+                self._tariffs_cache = json.load(f)
+            self._tariffs_stat = (st.st_mtime, st.st_size)
+
+        # Callers modify the result (calculate_breakeven_tariffs adds p_con)
+        return self._tariffs_cache.copy()
 
     def calculate_breakeven_tariffs(self, E: float, I: float, base_tariffs: Dict[str, float]) -> Dict[str, float]:
         """
@@ -111,7 +203,7 @@ class EnergyCollector:
             # No consumption - use policy defaults
             tariffs["p_con"] = p_grid_con
             tariffs["p_pv"] = p_pv_policy
-            logger.debug(f"Break-even: No consumption, using defaults p_con={p_grid_con}")
+            logger.debug("Break-even: No consumption, using defaults p_con=%s", p_grid_con)
             return tariffs
         
         if E >= I:
@@ -126,115 +218,118 @@ class EnergyCollector:
                 # PV payout = weighted average of house revenue and grid export revenue
                 tariffs["p_pv"] = (I * p_grid_con + (E - I) * p_grid_del) / E
                 logger.info(
-                    f"Break-even SURPLUS (capped): E={E:.4f} I={I:.4f} "
-                    f"p_con={tariffs['p_con']:.2f} p_pv={tariffs['p_pv']:.2f} (reduced from {p_pv_policy})"
+                    "Break-even SURPLUS (capped): E=%.4f I=%.4f p_con=%.2f p_pv=%.2f (reduced from %s)",
+                    E, I, tariffs["p_con"], tariffs["p_pv"], p_pv_policy
                 )
             else:
                 tariffs["p_con"] = p_con_calc
                 tariffs["p_pv"] = p_pv_policy
                 logger.info(
-                    f"Break-even SURPLUS: E={E:.4f} I={I:.4f} "
-                    f"p_con={tariffs['p_con']:.2f} p_pv={tariffs['p_pv']:.2f}"
+                    "Break-even SURPLUS: E=%.4f I=%.4f p_con=%.2f p_pv=%.2f",
+                    E, I, tariffs["p_con"], tariffs["p_pv"]
                 )
         else:
             # DEFICIT: Community needs grid power
             tariffs["p_con"] = p_grid_con + (E / I) * (p_pv_policy - p_grid_con)
             tariffs["p_pv"] = p_pv_policy
             logger.info(
-                f"Break-even DEFICIT: E={E:.4f} I={I:.4f} "
-                f"p_con={tariffs['p_con']:.2f} p_pv={tariffs['p_pv']:.2f}"
+                "Break-even DEFICIT: E=%.4f I=%.4f p_con=%.2f p_pv=%.2f",
+                E, I, tariffs["p_con"], tariffs["p_pv"]
             )
         
         return tariffs
 
-    def process_message(self, mac: str, payload: Dict):
+    def process_message(self, mac: str, payload: Dict) -> None:
         """Process incoming MQTT message and calculate energy delta."""
-        if mac not in HOUSE_CONFIG:
+        i = self._mac_to_idx.get(mac)
+        if i is None:
             return
 
-        house_info = HOUSE_CONFIG[mac]
-        house_id = house_info["id"]
         ei = payload.get("Ei", 0)
         eo = payload.get("Eo", 0)
 
         # Check if we have valid previous values (ei/eo are never 0 in reality)
         # If previous is 0, we just started up - wait for next reading
-        if mac not in self.previous_values or self.previous_values[mac]["Ei"] == 0:
-            self.previous_values[mac] = {"Ei": ei, "Eo": eo}
-            logger.info(f"Startup: storing baseline for house {house_id} (Ei={ei}, Eo={eo})")
+        if self.prev_ei[i] == 0:
+            self.prev_ei[i] = ei
+            self.prev_eo[i] = eo
+            logger.info(f"Startup: storing baseline for house {self._house_ids[i]} (Ei={ei}, Eo={eo})")
             return
         
-        prev = self.previous_values[mac]
-        delta_ei = max(0, ei - prev["Ei"])
-        delta_eo = max(0, eo - prev["Eo"])
+        delta_ei = max(0, ei - self.prev_ei[i])
+        delta_eo = max(0, eo - self.prev_eo[i])
         
         # Update previous values
-        self.previous_values[mac] = {"Ei": ei, "Eo": eo}
+        self.prev_ei[i] = ei
+        self.prev_eo[i] = eo
         
         # Sanity check: skip unreasonably large deltas (>0.1 kWh = ~36kW for 10s)
         MAX_DELTA = 0.1
         if delta_ei > MAX_DELTA or delta_eo > MAX_DELTA:
-            logger.warning(f"Skipping invalid delta: ei={delta_ei:.4f}, eo={delta_eo:.4f} kWh (house {house_id})")
+            logger.warning(
+                f"Skipping invalid delta: ei={delta_ei:.4f}, eo={delta_eo:.4f} kWh (house {self._house_ids[i]})"
+            )
             return
         
-        if mac in self.current_interval:
-            self.current_interval[mac]["delta_ei"] += delta_ei
-            self.current_interval[mac]["delta_eo"] += delta_eo
-            self.current_interval[mac]["ei"] = ei
-            self.current_interval[mac]["eo"] = eo
-        else:
-            self.current_interval[mac] = {
-                "house_id": house_id,
-                "delta_ei": delta_ei,
-                "delta_eo": delta_eo,
-                "ei": ei,
-                "eo": eo,
-            }
-
-    def store_interval_data(self):
+        with self._interval_lock:
+            self.sum_dei[i] += delta_ei
+            self.sum_deo[i] += delta_eo
+            self.last_ei[i] = ei
+            self.last_eo[i] = eo
+            self.reported[i] = True
+
+    def store_interval_data(self) -> None:
         """Store all collected data for this interval to InfluxDB."""
-        if not self.current_interval:
-            return
-
-        # Step 1: Calculate totals (E and I)
-        total_consumption = 0  # I = total imports to houses
-        total_production = 0   # E = total exports from houses (PV)
-
-        for mac, data in self.current_interval.items():
-            total_consumption += data["delta_ei"]
-            total_production += data["delta_eo"]
+        # Take this interval's data and start the next one in fresh arrays, so deltas
+        # arriving on the worker thread meanwhile are counted in the next interval
+        with self._interval_lock:
+            idx = np.flatnonzero(self.reported)
+            if idx.size == 0:
+                return
+            sum_dei, sum_deo = self.sum_dei, self.sum_deo
+            last_ei, last_eo = self.last_ei[idx], self.last_eo[idx]
+            self.sum_dei = np.zeros_like(sum_dei)
+            self.sum_deo = np.zeros_like(sum_deo)
+            self.reported = np.zeros_like(self.reported)
+
+        # Step 1: Calculate totals (E and I); houses without data this interval hold zeros
+        total_consumption = float(sum_dei.sum())  # I = total imports to houses
+        total_production = float(sum_deo.sum())   # E = total exports from houses (PV)
 
         # Step 2: Calculate break-even tariffs based on E and I
         base_tariffs = self.load_base_tariffs()
         tariffs = self.calculate_breakeven_tariffs(total_production, total_consumption, base_tariffs)
 
-        # Step 3: Create house data points with calculated tariffs
-        points = []
-
-        for mac, data in self.current_interval.items():
-            delta_ei = data["delta_ei"]
-            delta_eo = data["delta_eo"]
-
-            value_consumption = delta_ei * tariffs["p_con"]
-            value_pv_delivery = delta_eo * tariffs["p_pv"]
-
-            # Net flow per home: positive = exporting, negative = importing
-            net_flow_home = delta_eo - delta_ei
-
-            point = Point("house_energy") \
-                .tag("house_id", str(data["house_id"])) \
-                .tag("mac", mac) \
-                .field("ei_kwh", float(data["ei"])) \
-                .field("eo_kwh", float(data["eo"])) \
-                .field("delta_ei_kwh", float(delta_ei)) \
-                .field("delta_eo_kwh", float(delta_eo)) \
-                .field("net_flow_kwh", float(net_flow_home)) \
-                .field("value_consumption_ct", float(value_consumption)) \
-                .field("value_pv_delivery_ct", float(value_pv_delivery)) \
-                .field("tariff_p_consumption", float(tariffs["p_con"])) \
-                .field("tariff_p_pv_delivery", float(tariffs["p_pv"]))
-
-            points.append(point)
+        # Step 3: Create house data lines with calculated tariffs, one row per reporting house
+        delta_ei = sum_dei[idx]
+        delta_eo = sum_deo[idx]
+        rows = np.column_stack((
+            last_ei,
+            last_eo,
+            delta_ei,
+            delta_eo,
+            delta_eo - delta_ei,  # Net flow per home: positive = exporting, negative = importing
+            delta_ei * tariffs["p_con"],
+            delta_eo * tariffs["p_pv"],
+        )).tolist()
+
+        p_con = float(tariffs["p_con"])
+        p_pv = float(tariffs["p_pv"])
+        lines = [
+            HOUSE_LINE.format(
+                series=self._house_series[i],
+                ei=ei,
+                eo=eo,
+                delta_ei=dei,
+                delta_eo=deo,
+                net_flow=net_flow,
+                value_con=value_con,
+                value_pv=value_pv,
+                p_con=p_con,
+                p_pv=p_pv,
+            )
+            for i, (ei, eo, dei, deo, net_flow, value_con, value_pv) in zip(idx.tolist(), rows)
+        ]
 
         # Step 4: Calculate grid exchange
         net_energy = total_production - total_consumption
@@ -249,29 +344,26 @@ class EnergyCollector:
         value_grid_export = grid_export * tariffs["p_grid_del"]
         value_grid_import = grid_import * tariffs["p_grid_con"]
 
-        # Step 5: Create community data point
-        community_point = Point("community_energy") \
-            .field("total_consumption_kwh", total_consumption) \
-            .field("total_production_kwh", total_production) \
-            .field("grid_import_kwh", float(grid_import)) \
-            .field("grid_export_kwh", float(grid_export)) \
-            .field("value_grid_import_ct", float(value_grid_import)) \
-            .field("value_grid_export_ct", float(value_grid_export)) \
-            .field("tariff_p_grid_consumption", float(tariffs["p_grid_con"])) \
-            .field("tariff_p_grid_delivery", float(tariffs["p_grid_del"]))
-
-        points.append(community_point)
-
-        # Step 6: Write all points to InfluxDB
-        self.write_api.write(bucket=INFLUX_BUCKET, record=points)
+        # Step 5: Create community data line
+        lines.append(COMMUNITY_LINE.format(
+            consumption=float(total_consumption),
+            production=float(total_production),
+            grid_import=float(grid_import),
+            grid_export=float(grid_export),
+            value_import=float(value_grid_import),
+            value_export=float(value_grid_export),
+            p_grid_con=float(tariffs["p_grid_con"]),
+            p_grid_del=float(tariffs["p_grid_del"]),
+        ))
+
+        # Step 6: Write all lines to InfluxDB
+        self.write_api.write(bucket=INFLUX_BUCKET, record=lines)
 
         logger.info(
             f"Stored: cons={total_consumption:.4f}kWh, prod={total_production:.4f}kWh, "
             f"p_con={tariffs['p_con']:.2f}, p_pv={tariffs['p_pv']:.2f}"
         )
 
-        self.current_interval.clear()
-
 
 def on_connect(client, userdata, flags, rc, properties=None):
     if rc == 0:
@@ -283,12 +375,8 @@ def on_connect(client, userdata, flags, rc, properties=None):
 
 
 def on_message(client, userdata, msg):
-    try:
-        mac = msg.topic.split("/")[0]
-        payload = json.loads(msg.payload.decode())
-        userdata["collector"].process_message(mac, payload)
-    except Exception as e:
-        logger.error(f"Error processing message: {e}")
+    # Parsing and processing happen on the collector's worker thread
+    userdata["collector"].submit_message(msg.topic.partition("/")[0], msg.payload)
 
 
 def main():
@@ -322,7 +410,7 @@ def main():
         logger.info("Shutting down collector")
         client.loop_stop()
         client.disconnect()
-        collector.influx_client.close()
+        collector.close()
 
 
 if __name__ == "__main__":
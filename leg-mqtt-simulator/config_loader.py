@@ -0,0 +1,20 @@
+"""Cached YAML configuration loading for the simulator."""
+
+import os
+from functools import lru_cache
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _Loader
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.yaml')
+
+
+@lru_cache(maxsize=1)
+def get_config() -> dict:
+    """Return the simulator configuration, parsed once per process (read-only)."""
+    with open(CONFIG_FILE, 'r') as f:
+        return yaml.load(f, Loader=_Loader)
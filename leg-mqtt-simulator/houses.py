@@ -1,6 +1,5 @@
 """House simulation with load profiles and energy metering."""
 
-import os
 import random
 import json
 from datetime import datetime, timedelta
@@ -8,14 +7,11 @@ from dateutil.relativedelta import relativedelta
 from dataclasses import dataclass, field
 from typing import Optional
 
-import yaml
-
+from config_loader import get_config
 from solar import get_pv_production_kw
 
 # Load configuration from YAML
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.yaml')
-with open(CONFIG_FILE, 'r') as f:
-    _config = yaml.safe_load(f)
+_config = get_config()
 
 # Extract load parameters
 _load = _config.get('load', {})
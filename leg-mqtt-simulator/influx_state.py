@@ -1,17 +1,20 @@
 """InfluxDB state writer for simulator."""
 
-import os
 import logging
-import yaml
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+from typing import TYPE_CHECKING, Optional
+
+from influxdb_client import InfluxDBClient
+from influxdb_client.client.write_api import WriteOptions
+
+from config_loader import get_config
+
+if TYPE_CHECKING:
+    from houses import ApplianceState, House
 
 logger = logging.getLogger(__name__)
 
 # Load configuration
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
-with open(CONFIG_FILE, "r") as f:
-    _config = yaml.safe_load(f)
+_config = get_config()
 
 _influx = _config.get("influxdb", {})
 INFLUX_URL = _influx.get("url", "http://localhost:8086")
@@ -19,14 +22,33 @@ INFLUX_TOKEN = _influx.get("token", "")
 INFLUX_ORG = _influx.get("org", "LEG")
 INFLUX_BUCKET = _influx.get("bucket", "energy")
 
+# Batched InfluxDB writes
+WRITE_OPTIONS = WriteOptions(batch_size=500, flush_interval=10_000, jitter_interval=2_000, retry_interval=5_000)
+
+# Line protocol
+_ESCAPE_TAG = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ "})
+STATE_LINE = (
+    "simulator_state,house_id={house_id} "
+    "pv_kwp={pv_kwp},washing_kw={washing_kw},dishwasher_kw={dishwasher_kw},ev_kw={ev_kw}"
+)
+
+# Last-state marker shared by all houses whose appliances are all off (never modified)
+_AT_REST = [0.0, 0.0, 0.0]
+
+# (washing machine, dishwasher, EV chargers) of one house
+_HouseAppliances = tuple[Optional["ApplianceState"], Optional["ApplianceState"], tuple["ApplianceState", ...]]
+
 
 class StateWriter:
     """Writes simulator state to InfluxDB."""
     
-    def __init__(self):
+    def __init__(self) -> None:
         self.client = None
         self.write_api = None
-        self._last_state = {}  # Track last state per house to detect changes
+        # house.id -> [washing_kw, dishwasher_kw, ev_kw] last written, or _AT_REST
+        self._last_state: dict[int, list[float]] = {}
+        # house.id -> (washing, dishwasher, EV chargers)
+        self._appliance_cache: dict[int, "_HouseAppliances"] = {}
         
         if INFLUX_TOKEN:
             try:
@@ -36,56 +58,86 @@ class StateWriter:
                     org=INFLUX_ORG,
                     verify_ssl=False
                 )
-                self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+                self.write_api = self.client.write_api(
+                    write_options=WRITE_OPTIONS,
+                    error_callback=self._on_write_error
+                )
                 logger.info(f"Connected to InfluxDB at {INFLUX_URL}")
             except Exception as e:
                 logger.error(f"Failed to connect to InfluxDB: {e}")
     
-    def write_state(self, house, force: bool = False):
+    def _appliances(self, house: "House") -> "_HouseAppliances":
+        """Return (washing, dishwasher, EV chargers) of a house, looked up once per house."""
+        cached = self._appliance_cache.get(house.id)
+        if cached is None:
+            washing = dishwasher = None
+            evs: list["ApplianceState"] = []
+            for a in house.appliances:
+                if a.name == "washing":
+                    washing = a
+                elif a.name == "dishwasher":
+                    dishwasher = a
+                elif a.name.startswith("ev_"):
+                    evs.append(a)
+            cached = self._appliance_cache[house.id] = (washing, dishwasher, tuple(evs))
+        return cached
+    
+    def write_state(self, house: "House", force: bool = False) -> None:
         """Write house state to InfluxDB if changed or forced."""
         if not self.write_api:
             return
         
+        house_id = house.id
         # Get current appliance power values (kW)
-        washing_kw = 0.0
-        dishwasher_kw = 0.0
+        washing, dishwasher, evs = self._appliances(house)
+        washing_kw = washing.power_kw if washing is not None and washing.active else 0.0
+        dishwasher_kw = dishwasher.power_kw if dishwasher is not None and dishwasher.active else 0.0
         ev_kw = 0.0
+        for ev in evs:
+            if ev.active:
+                ev_kw = ev.power_kw
         
-        for a in house.appliances:
-            if a.name == "washing" and a.active:
-                washing_kw = a.power_kw
-            elif a.name == "dishwasher" and a.active:
-                dishwasher_kw = a.power_kw
-            elif a.name.startswith("ev_") and a.active:
-                ev_kw = a.power_kw
-        
-        # Build current state tuple for comparison
-        current_state = (washing_kw, dishwasher_kw, ev_kw)
-        
-        # Check if state changed
-        last = self._last_state.get(house.id)
-        if not force and last == current_state:
+        # Check if state changed; the last written state is kept in a per-house list updated in place
+        last = self._last_state.get(house_id)
+        if washing_kw == 0.0 and dishwasher_kw == 0.0 and ev_kw == 0.0:
+            # All appliances off (the common case): houses at rest share one sentinel state
+            if not force and last is _AT_REST:
+                return  # No change
+            self._last_state[house_id] = _AT_REST
+        elif last is None or last is _AT_REST:
+            self._last_state[house_id] = [washing_kw, dishwasher_kw, ev_kw]
+        elif not force and last[0] == washing_kw and last[1] == dishwasher_kw and last[2] == ev_kw:
             return  # No change
-        
-        self._last_state[house.id] = current_state
+        else:
+            last[0] = washing_kw
+            last[1] = dishwasher_kw
+            last[2] = ev_kw
         
         try:
-            point = Point("simulator_state") \
-                .tag("house_id", str(house.id)) \
-                .field("pv_kwp", float(house.pv_kwp)) \
-                .field("washing_kw", float(washing_kw)) \
-                .field("dishwasher_kw", float(dishwasher_kw)) \
-                .field("ev_kw", float(ev_kw))
-            
-            self.write_api.write(bucket=INFLUX_BUCKET, record=point)
+            line = STATE_LINE.format(
+                house_id=str(house_id).translate(_ESCAPE_TAG),
+                pv_kwp=float(house.pv_kwp),
+                washing_kw=float(washing_kw),
+                dishwasher_kw=float(dishwasher_kw),
+                ev_kw=float(ev_kw),
+            )
+
+            self.write_api.write(bucket=INFLUX_BUCKET, record=line)
             
             if washing_kw > 0 or dishwasher_kw > 0 or ev_kw > 0:
-                logger.info(f"House {house.id} state: washing={washing_kw}kW, dishwasher={dishwasher_kw}kW, ev={ev_kw}kW")
+                logger.info(f"House {house_id} state: washing={washing_kw}kW, dishwasher={dishwasher_kw}kW, ev={ev_kw}kW")
             
         except Exception as e:
-            logger.error(f"Failed to write state for house {house.id}: {e}")
+            logger.error(f"Failed to write state for house {house_id}: {e}")
     
-    def close(self):
-        """Close InfluxDB connection."""
+    @staticmethod
+    def _on_write_error(conf, data, exception):
+        """Log a batch the background writer failed to store."""
+        logger.error(f"Failed to write batch to InfluxDB: {exception}")
+
+    def close(self) -> None:
+        """Flush buffered points and close InfluxDB connection."""
+        if self.write_api:
+            self.write_api.close()
         if self.client:
             self.client.close()
@@ -14,16 +14,31 @@ import os
 import logging
 from datetime import datetime
 
-import yaml
 import paho.mqtt.client as mqtt
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+
+    def _dumps_indented(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:  # orjson not installed, use the stdlib codec
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    def _dumps_indented(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+    _loads = json.loads
+
+from config_loader import get_config
 from houses import House
 from influx_state import StateWriter
 
 # Load configuration from YAML
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.yaml')
-with open(CONFIG_FILE, 'r') as f:
-    config = yaml.safe_load(f)
+config = get_config()
 
 # Extract config values
 MQTT_BROKER = config['mqtt']['broker']
@@ -33,6 +48,7 @@ MQTT_USERNAME = config['mqtt'].get('username', '')
 MQTT_PASSWORD = config['mqtt'].get('password', '')
 
 UPDATE_INTERVAL = config['simulator']['update_interval']
+SUMMARY_EVERY_TICKS = max(1, round(60 / UPDATE_INTERVAL))  # Per-house summary about once a minute
 STATE_FILE = os.path.join(os.path.dirname(__file__), config['simulator']['state_file'])
 HOUSES = config['houses']
 
@@ -62,8 +78,8 @@ def signal_handler(signum, frame):
 def load_state() -> dict:
     """Load persisted state from file."""
     try:
-        with open(STATE_FILE, "r") as f:
-            return json.load(f)
+        with open(STATE_FILE, "rb") as f:
+            return _loads(f.read())
     except FileNotFoundError:
         logger.info("No state file found, starting fresh")
         return {}
@@ -79,8 +95,8 @@ def save_state(houses: list[House]):
         state[house.mac] = house.get_state()
     
     try:
-        with open(STATE_FILE, "w") as f:
-            json.dump(state, f, indent=2)
+        with open(STATE_FILE, "wb") as f:
+            f.write(_dumps_indented(state))
     except Exception as e:
         logger.error(f"Error saving state: {e}")
 
@@ -156,33 +172,37 @@ def main():
     
     logger.info(f"Publishing every {UPDATE_INTERVAL} seconds")
     
-    last_save = time.time()
+    # Sensor topic per house (fixed for the lifetime of the process)
+    topics = [f"{house.mac}/SENSOR" for house in houses]
+    
+    last_save = time.monotonic()
     save_interval = 60  # Save state every minute
+    tick = 0
     
     try:
         while running:
-            loop_start = time.time()
+            # One monotonic timestamp per tick for scheduling
+            loop_start = time.monotonic()
             
-            for house in houses:
+            results = []
+            for house, topic in zip(houses, topics):
                 # Update house state and get message
                 payload = house.update(UPDATE_INTERVAL)
-                topic = f"{house.mac}/SENSOR"
                 
-                # Publish to MQTT
-                message = json.dumps(payload)
-                result = client.publish(topic, message)
-                
-                if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                    logger.debug(f"Published to {topic}: Pi={payload['Pi']:.3f}, Po={payload['Po']:.3f}")
-                else:
-                    logger.error(f"Failed to publish to {topic}: {result.rc}")
+                # Queue for MQTT; results are checked once the whole tick is queued
+                results.append(client.publish(topic, _dumps(payload)))
                 
                 # Write state to InfluxDB if changed
                 state_writer.write_state(house)
             
-            # Log summary periodically
-            now = datetime.now()
-            if now.second < UPDATE_INTERVAL:
+            for topic, result in zip(topics, results):
+                if result.rc != mqtt.MQTT_ERR_SUCCESS:
+                    logger.error(f"Failed to publish to {topic}: {result.rc}")
+            logger.debug(f"Published {len(results)} messages")
+            
+            # Log summary periodically (skipping the PV lookups when INFO is disabled)
+            if tick % SUMMARY_EVERY_TICKS == 0 and logger.isEnabledFor(logging.INFO):
+                now = datetime.now()
                 for house in houses:
                     pv = house.get_pv_production_kw(now)
                     logger.info(
@@ -191,12 +211,14 @@ def main():
                     )
             
             # Save state periodically
-            if time.time() - last_save > save_interval:
+            if loop_start - last_save > save_interval:
                 save_state(houses)
-                last_save = time.time()
+                last_save = loop_start
+            
+            tick += 1
             
             # Sleep for remaining interval
-            elapsed = time.time() - loop_start
+            elapsed = time.monotonic() - loop_start
             sleep_time = max(0, UPDATE_INTERVAL - elapsed)
             time.sleep(sleep_time)
     
@@ -0,0 +1,330 @@
+// Clientside construction of the energy flow figure.
+//
+// The server only ships a compact snapshot (see layout.graph_data); the
+// Plotly figure is assembled here so no figure JSON crosses the wire.
+
+(function () {
+    // Fixed line width for all connections
+    var LINE_WIDTH = 2;
+    var ARROW_WIDTH = 2;
+
+    // Component arrangement around house (radius from house center)
+    var COMP_RADIUS = 1.2;
+    var PV_ANGLE = Math.PI / 2;       // top
+    var BASE_ANGLE = -Math.PI / 2;    // bottom
+    var EV_ANGLE = Math.PI;           // left
+    var WASHER_ANGLE = 0;             // right
+
+    var HOUSE_SPACING = 3.5;
+
+    function formatPower(watts) {
+        // Format power value with unit
+        if (Math.abs(watts) >= 1000) {
+            return (watts / 1000).toFixed(1) + "kW";
+        }
+        return watts.toFixed(0) + "W";
+    }
+
+    // Node positions depend only on the house count, so compute them once
+    var positionCache = {};
+
+    function layoutPositions(numHouses) {
+        if (positionCache[numHouses]) {
+            return positionCache[numHouses];
+        }
+        var positions = [];
+        for (var idx = 0; idx < numHouses; idx++) {
+            // Houses arranged horizontally at top
+            var houseX = (idx - (numHouses - 1) / 2) * HOUSE_SPACING;
+            var houseY = 4;
+            positions.push({
+                house: [houseX, houseY],
+                pv: [houseX + COMP_RADIUS * Math.cos(PV_ANGLE), houseY + COMP_RADIUS * Math.sin(PV_ANGLE)],
+                base: [houseX + COMP_RADIUS * Math.cos(BASE_ANGLE), houseY + COMP_RADIUS * Math.sin(BASE_ANGLE)],
+                ev: [houseX + COMP_RADIUS * Math.cos(EV_ANGLE), houseY + COMP_RADIUS * Math.sin(EV_ANGLE)],
+                washer: [houseX + COMP_RADIUS * Math.cos(WASHER_ANGLE), houseY + COMP_RADIUS * Math.sin(WASHER_ANGLE)],
+            });
+        }
+        positionCache[numHouses] = positions;
+        return positions;
+    }
+
+    function addEdge(edges, x0, y0, x1, y1, color) {
+        // Edges of one color share a single trace, segments separated by null
+        var edge = edges[color] || (edges[color] = {x: [], y: []});
+        edge.x.push(x0, x1, null);
+        edge.y.push(y0, y1, null);
+    }
+
+    function edgeTraces(edges) {
+        // Emitted before the node traces so the lines draw underneath them
+        return Object.keys(edges).map(function (color) {
+            return {
+                type: "scatter",
+                x: edges[color].x,
+                y: edges[color].y,
+                mode: "lines",
+                line: {color: color, width: LINE_WIDTH},
+                hoverinfo: "skip",
+            };
+        });
+    }
+
+    function arrow(x, y, ax, ay, color) {
+        return {
+            x: x, y: y,
+            ax: ax, ay: ay,
+            xref: "x", yref: "y", axref: "x", ayref: "y",
+            showarrow: true, arrowhead: 2, arrowsize: 1.2, arrowwidth: ARROW_WIDTH, arrowcolor: color,
+        };
+    }
+
+    function flowColor(flow) {
+        return flow > 0 ? "#1b9e77" : flow < 0 ? "#d95f02" : "#ccc";
+    }
+
+    // Hover templates (one per node kind), filled from each point's text/customdata
+    var HOUSE_HOVER = "<b>%{text}</b><br>Net: %{customdata.net}<extra></extra>";
+    var COMMUNITY_HOVER = "<b>Community Bus</b><br>Total PV: %{customdata.production}<br>" +
+        "Total Load: %{customdata.consumption}<br>Net: %{customdata.net}<extra></extra>";
+    var GRID_HOVER = "<b>External Grid</b><br>Import: %{customdata.import}<br>Export: %{customdata.export}<extra></extra>";
+    var PV_HOVER = "<b>PV Panel</b><br>%{customdata.power} - Click to edit<extra></extra>";
+    var BASE_HOVER = "<b>Base Load</b><br>%{customdata.power} - Click to edit<extra></extra>";
+    var EV_HOVER = "<b>EV Charger</b><br>%{customdata.power} - Click to edit<extra></extra>";
+    var WASHER_HOVER = "<b>Washer</b><br>%{customdata.power} - Click to edit<extra></extra>";
+
+    // Legend with icons (positioned to the right)
+    var LEGEND_ANNOTATIONS = [
+        {x: 10, y: 4, text: "<b>Legend</b>", showarrow: false, font: {size: 14}, xanchor: "left"},
+        {x: 10, y: 3.2, text: "☀️ PV (production)", showarrow: false, font: {size: 13, color: "#f4d03f"}, xanchor: "left"},
+        {x: 10, y: 2.4, text: "💡 Base load", showarrow: false, font: {size: 13, color: "#d95f02"}, xanchor: "left"},
+        {x: 10, y: 1.6, text: "🚗 EV charger", showarrow: false, font: {size: 13, color: "#e74c3c"}, xanchor: "left"},
+        {x: 10, y: 0.8, text: "🧺 Washer", showarrow: false, font: {size: 13, color: "#9b59b6"}, xanchor: "left"},
+        {x: 10, y: -0.2, text: "<b>→</b> Green = Export", showarrow: false, font: {size: 12, color: "#1b9e77"}, xanchor: "left"},
+        {x: 10, y: -1.0, text: "<b>→</b> Orange = Import", showarrow: false, font: {size: 12, color: "#d95f02"}, xanchor: "left"},
+    ];
+
+    // Layout shared by every figure; only the annotations change per snapshot
+    var STATIC_LAYOUT = {
+        showlegend: false,
+        hovermode: "closest",
+        margin: {l: 20, r: 20, t: 50, b: 20},
+        xaxis: {showgrid: false, zeroline: false, showticklabels: false, range: [-10, 14]},
+        yaxis: {showgrid: false, zeroline: false, showticklabels: false, range: [-9, 7], scaleanchor: "x"},
+        plot_bgcolor: "#f8f9fa",
+        paper_bgcolor: "#f8f9fa",
+        height: 1000,
+        title: {text: "LEG Energy Flow Simulator", x: 0.5, font: {size: 20}},
+    };
+
+    // Snapshot the current figure was built from; unchanged snapshots skip
+    // both the rebuild and the Plotly re-render
+    var lastSnapshotKey = null;
+
+    function buildGraph(snapshot) {
+        // Build the energy flow graph with house components arranged in a circle
+        if (!snapshot) {
+            return window.dash_clientside.no_update;
+        }
+        var snapshotKey = JSON.stringify(snapshot);
+        if (snapshotKey === lastSnapshotKey) {
+            return window.dash_clientside.no_update;
+        }
+        lastSnapshotKey = snapshotKey;
+
+        // Main nodes (text below): houses, community, grid
+        var main = {x: [], y: [], text: [], color: [], size: [], hover: [], customdata: []};
+
+        // Component nodes (text inside): PV, base load, EV, washer
+        var comp = {x: [], y: [], text: [], color: [], size: [], hover: [], customdata: []};
+
+        var annotations = [];
+        var edges = {};
+
+        var houses = snapshot.houses;
+        // Power values arrive as integers scaled by snapshot.scale (deciwatts)
+        var scale = snapshot.scale;
+        var positions = layoutPositions(houses.length);
+
+        // Community bus (below houses, centered)
+        var commX = 0, commY = -2;
+        // Grid (below community, centered)
+        var gridX = 0, gridY = -6;
+
+        houses.forEach(function (house, idx) {
+            var pos = positions[idx];
+            var houseX = pos.house[0], houseY = pos.house[1];
+
+            // Main house node
+            main.x.push(houseX);
+            main.y.push(houseY);
+            main.text.push("House " + (idx + 1));
+            main.color.push("#4a90d9");
+            main.size.push(40);
+            main.hover.push(HOUSE_HOVER);
+            main.customdata.push({type: "house", id: idx, net: formatPower(house.net_power_w / scale)});
+
+            // PV panel (top)
+            var pvX = pos.pv[0], pvY = pos.pv[1];
+            var pvPower = house.pv_power_w / scale;
+            var pvLabel = formatPower(pvPower);
+            comp.x.push(pvX);
+            comp.y.push(pvY);
+            comp.text.push("☀️<br>" + pvLabel);
+            comp.color.push(pvPower > 100 ? "#f4d03f" : "#bbb");
+            comp.size.push(55);
+            comp.hover.push(PV_HOVER);
+            comp.customdata.push({type: "pv", id: idx, power: pvLabel});
+            // Line: PV - House
+            addEdge(edges, pvX, pvY, houseX, houseY, "#1b9e77");
+
+            // Base load (bottom)
+            var baseX = pos.base[0], baseY = pos.base[1];
+            var baseLabel = formatPower(house.base_load_w / scale);
+            comp.x.push(baseX);
+            comp.y.push(baseY);
+            comp.text.push("💡<br>" + baseLabel);
+            comp.color.push("#d95f02");
+            comp.size.push(55);
+            comp.hover.push(BASE_HOVER);
+            comp.customdata.push({type: "base", id: idx, clickable: true, power: baseLabel});
+            // Line: House - Base
+            addEdge(edges, houseX, houseY, baseX, baseY, "#d95f02");
+
+            // EV Charger (left)
+            var evX = pos.ev[0], evY = pos.ev[1];
+            var evPower = house.ev_load_w / scale;
+            var evOn = evPower > 0;
+            var evLabel = formatPower(evPower);
+            comp.x.push(evX);
+            comp.y.push(evY);
+            comp.text.push(evOn ? "🚗<br>" + evLabel : "🚗<br>0kW");
+            comp.color.push(evOn ? "#e74c3c" : "#95a5a6");
+            comp.size.push(55);
+            comp.hover.push(EV_HOVER);
+            comp.customdata.push({type: "ev", id: idx, clickable: true, power: evLabel});
+            // Line: House - EV
+            addEdge(edges, houseX, houseY, evX, evY, evOn ? "#e74c3c" : "#ccc");
+
+            // Washer (right)
+            var washerX = pos.washer[0], washerY = pos.washer[1];
+            var washerPower = house.washer_load_w / scale;
+            var washerOn = washerPower > 0;
+            var washerLabel = formatPower(washerPower);
+            comp.x.push(washerX);
+            comp.y.push(washerY);
+            comp.text.push(washerOn ? "🧺<br>" + washerLabel : "🧺<br>0kW");
+            comp.color.push(washerOn ? "#9b59b6" : "#95a5a6");
+            comp.size.push(55);
+            comp.hover.push(WASHER_HOVER);
+            comp.customdata.push({type: "washer", id: idx, clickable: true, power: washerLabel});
+            // Line: House - Washer
+            addEdge(edges, houseX, houseY, washerX, washerY, washerOn ? "#9b59b6" : "#ccc");
+
+            // Line from house to community (always visible)
+            var flow = house.net_power_w / scale;
+            var color = flowColor(flow);
+            addEdge(edges, houseX, houseY, commX, commY, Math.abs(flow) <= 10 ? "#ccc" : color);
+
+            if (Math.abs(flow) > 10) {
+                if (flow > 0) {  // Export: House -> Community
+                    annotations.push(arrow(commX, commY, houseX, houseY, color));
+                } else {  // Import: Community -> House
+                    annotations.push(arrow(houseX, houseY, commX, commY, color));
+                }
+                // Flow label
+                annotations.push({
+                    x: (houseX + commX) / 2 + 0.5, y: (houseY + commY) / 2,
+                    text: "<b>" + formatPower(Math.abs(flow)) + "</b>",
+                    showarrow: false,
+                    font: {size: 10, color: color},
+                });
+            }
+        });
+
+        var community = snapshot.community;
+        main.x.push(commX);
+        main.y.push(commY);
+        main.text.push("Community");
+        main.color.push("#3498db");
+        main.size.push(60);
+        main.hover.push(COMMUNITY_HOVER);
+        main.customdata.push({
+            type: "community",
+            production: formatPower(community.total_production_w / scale),
+            consumption: formatPower(community.total_consumption_w / scale),
+            net: formatPower(community.net_community_power_w / scale),
+        });
+
+        var grid = snapshot.grid;
+        main.x.push(gridX);
+        main.y.push(gridY);
+        main.text.push("Grid");
+        main.color.push("#7f8c8d");
+        main.size.push(55);
+        main.hover.push(GRID_HOVER);
+        main.customdata.push({
+            type: "grid",
+            import: formatPower(grid.grid_import_w / scale),
+            export: formatPower(grid.grid_export_w / scale),
+        });
+
+        // Community to grid connection (always visible)
+        var communityFlow = community.net_community_power_w / scale;
+        var gridColor = flowColor(communityFlow);
+        addEdge(edges, commX, commY, gridX, gridY, Math.abs(communityFlow) <= 10 ? "#ccc" : gridColor);
+
+        if (Math.abs(communityFlow) > 10) {
+            if (communityFlow > 0) {  // Export
+                annotations.push(arrow(gridX, gridY, commX, commY, gridColor));
+            } else {  // Import
+                annotations.push(arrow(commX, commY, gridX, gridY, gridColor));
+            }
+            annotations.push({
+                x: 0.5, y: (commY + gridY) / 2,
+                text: "<b>" + formatPower(Math.abs(communityFlow)) + "</b>",
+                showarrow: false,
+                font: {size: 12, color: gridColor},
+            });
+        }
+
+        // Main nodes trace
+        var mainTrace = {
+            type: "scatter",
+            x: main.x,
+            y: main.y,
+            mode: "markers+text",
+            text: main.text,
+            textposition: "bottom center",
+            textfont: {size: 12, color: "black", family: "Arial Black"},
+            hovertemplate: main.hover,
+            marker: {size: main.size, color: main.color, line: {width: 2, color: "#333"}},
+            customdata: main.customdata,
+        };
+
+        // Component nodes trace
+        var compTrace = {
+            type: "scatter",
+            x: comp.x,
+            y: comp.y,
+            mode: "markers+text",
+            text: comp.text,
+            textposition: "middle center",
+            textfont: {size: 10, color: "black", family: "Arial Black"},
+            hovertemplate: comp.hover,
+            marker: {size: comp.size, color: comp.color, line: {width: 2, color: "#333"}},
+            customdata: comp.customdata,
+        };
+
+        return {
+            data: edgeTraces(edges).concat([mainTrace, compTrace]),
+            layout: Object.assign({}, STATIC_LAYOUT, {annotations: annotations.concat(LEGEND_ANNOTATIONS)}),
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        energy: {
+            buildGraph: buildGraph,
+        },
+    });
+})();
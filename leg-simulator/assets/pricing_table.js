@@ -0,0 +1,88 @@
+// Clientside rendering of the energy cost table body.
+//
+// The server only ships the computed amounts (see app.update_pricing); rows
+// and cells are built here and styled by pricing_table.css.
+
+(function () {
+    var BUY = "num buy group-start";
+    var SELL = "num sell group-end";
+    var NA_START = "num na group-start";
+    var NA_END = "num na group-end";
+
+    // Classes of the House/Community amount columns, in row order
+    var AMOUNT_CLASSES = [BUY, SELL, BUY, SELL];
+
+    function td(children, className, colSpan) {
+        var props = {children: children, className: className};
+        if (colSpan) {
+            props.colSpan = colSpan;
+        }
+        return {namespace: "dash_html_components", type: "Td", props: props};
+    }
+
+    function tr(cells, className) {
+        return {namespace: "dash_html_components", type: "Tr", props: {children: cells, className: className}};
+    }
+
+    function fmt(value) {
+        return value.toFixed(1);
+    }
+
+    function amountCells(values) {
+        return values.map(function (value, col) {
+            return td(fmt(value), AMOUNT_CLASSES[col]);
+        });
+    }
+
+    function renderTable(pricing) {
+        if (!pricing) {
+            return window.dash_clientside.no_update;
+        }
+
+        var rows = pricing.rows.map(function (row, idx) {
+            return tr([td("House " + (idx + 1), "title")]
+                .concat(amountCells(row))
+                .concat([td("-", NA_START), td("-", NA_END)]));
+        });
+
+        // Grid row (between houses and total)
+        var gridBuy = pricing.grid[0];
+        var gridSell = pricing.grid[1];
+        rows.push(tr([
+            td("Grid", "title"),
+            td("-", NA_START),
+            td("-", NA_END),
+            td(gridSell > 0 ? fmt(gridSell) : "-", BUY),
+            td(gridBuy > 0 ? fmt(gridBuy) : "-", SELL),
+            td(fmt(gridBuy), BUY),
+            td(fmt(gridSell), SELL),
+        ], "grid-row"));
+
+        // Total row
+        var totals = pricing.totals;
+        rows.push(tr([td("TOTAL", "")]
+            .concat(amountCells(totals))
+            .concat([td(fmt(gridBuy), BUY), td(fmt(gridSell), SELL)]), "total-row"));
+
+        // Community Profit row - prominent display with large font
+        var profit = pricing.profit;
+        var profitClass = "profit-value";
+        if (Math.abs(profit) < 0.1) {
+            profitClass += " balanced";
+        } else if (profit < 0) {
+            profitClass += " loss";
+        }
+        rows.push(tr([
+            td("Community Profit:", "profit-label", 5),
+            td(fmt(profit) + " ct/h", profitClass, 2),
+        ], "profit-row"));
+
+        return rows;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        pricing: {
+            renderTable: renderTable,
+        },
+    });
+})();
@@ -1,6 +1,8 @@
-import random
+import threading
 from dataclasses import dataclass
 
+import numpy as np
+
 
 @dataclass
 class HouseState:
@@ -25,59 +27,73 @@ class GridExchange:
     grid_export_w: float
 
 
+# User-editable per-house values (W), stored as one column per field
+HOUSE_FIELDS = ("pv_power_w", "base_load_w", "ev_load_w", "washer_load_w")
+HOUSE_DTYPE = np.dtype([(name, np.float64) for name in HOUSE_FIELDS])
+
+
 class EnergyModel:
     def __init__(self, house_count: int) -> None:
         self.house_count = house_count
-        self._houses = []
-        for idx in range(house_count):
-            self._houses.append(
-                {
-                    "house_id": f"house_{idx + 1}",
-                    "base_load_w": random.randint(5, 20) * 100,  # Random 500-2000W
-                    "pv_power_w": 0,
-                    "ev_load_w": 0,  # User-editable EV charger power
-                    "washer_load_w": 0,  # User-editable washer power
-                }
-            )
+        self._house_ids = [f"house_{idx + 1}" for idx in range(house_count)]
+        self._houses = np.zeros(house_count, dtype=HOUSE_DTYPE)
+        # One HouseState per house, updated in place by every update()
+        self._house_states = [HouseState(house_id, 0.0, 0.0, 0.0, 0.0, 0.0) for house_id in self._house_ids]
+        self._rng = np.random.default_rng()
+        self._houses["base_load_w"] = self._rng.integers(5, 21, size=house_count) * 100  # Random 500-2000W
+        # Edits arrive on Dash worker threads while update() reads the state
+        self._lock = threading.Lock()
+
+    def get_field(self, house_idx: int, field: str) -> float:
+        """Return one user-editable value (W) of a house."""
+        with self._lock:
+            return float(self._houses[field][house_idx])
+
+    def set_field(self, house_idx: int, field: str, value: float) -> None:
+        """Set one user-editable value (W) of a house."""
+        with self._lock:
+            self._houses[field][house_idx] = value
 
     def update(self) -> tuple[list[HouseState], CommunityState, GridExchange]:
-        house_states: list[HouseState] = []
-        total_prod = 0.0
-        total_cons = 0.0
-
-        for house in self._houses:
-            pv_power = house["pv_power_w"]
-            base_load = house["base_load_w"]
-            ev_load = house["ev_load_w"]
-            washer_load = house["washer_load_w"]
-
-            total_load = base_load + ev_load + washer_load
-            net_power = pv_power - total_load
-
-            total_prod += pv_power
-            total_cons += total_load
-
-            house_states.append(
-                HouseState(
-                    house_id=house["house_id"],
-                    pv_power_w=round(pv_power, 1),
-                    base_load_w=round(base_load, 1),
-                    ev_load_w=round(ev_load, 1),
-                    washer_load_w=round(washer_load, 1),
-                    net_power_w=round(net_power, 1),
-                )
-            )
+        """Compute the current energy flows.
+
+        The returned HouseState list and its objects are reused by the next
+        call; copy them if a snapshot has to outlive the following update().
+        """
+        with self._lock:
+            houses = self._houses.copy()
+
+        pv_power = houses["pv_power_w"]
+        base_load = houses["base_load_w"]
+        ev_load = houses["ev_load_w"]
+        washer_load = houses["washer_load_w"]
+
+        total_load = base_load + ev_load + washer_load
+        net_power = pv_power - total_load
+
+        total_prod = float(pv_power.sum())
+        total_cons = float(total_load.sum())
+
+        # Values stay unrounded; layout.graph_data quantizes them for display
+        rows = np.column_stack((pv_power, base_load, ev_load, washer_load, net_power)).tolist()
+        house_states = self._house_states
+        for state, (pv, base, ev, washer, net) in zip(house_states, rows):
+            state.pv_power_w = pv
+            state.base_load_w = base
+            state.ev_load_w = ev
+            state.washer_load_w = washer
+            state.net_power_w = net
 
         net_community = total_prod - total_cons
         community_state = CommunityState(
-            total_production_w=round(total_prod, 1),
-            total_consumption_w=round(total_cons, 1),
-            net_community_power_w=round(net_community, 1),
+            total_production_w=total_prod,
+            total_consumption_w=total_cons,
+            net_community_power_w=net_community,
         )
 
         grid_exchange = GridExchange(
-            grid_import_w=round(abs(net_community), 1) if net_community < 0 else 0.0,
-            grid_export_w=round(net_community, 1) if net_community > 0 else 0.0,
+            grid_import_w=-net_community if net_community < 0 else 0.0,
+            grid_export_w=net_community if net_community > 0 else 0.0,
         )
 
         return house_states, community_state, grid_exchange
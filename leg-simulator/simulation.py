@@ -14,6 +14,12 @@ class Simulation:
     def __init__(self, house_count: int) -> None:
         self.model = EnergyModel(house_count)
 
+    def get_field(self, house_idx: int, field: str) -> float:
+        return self.model.get_field(house_idx, field)
+
+    def set_field(self, house_idx: int, field: str, value: float) -> None:
+        self.model.set_field(house_idx, field, value)
+
     def tick(self) -> SimulationSnapshot:
         houses, community, grid = self.model.update()
         return SimulationSnapshot(houses=houses, community=community, grid=grid)